@@ -1,12 +1,29 @@
 import os
+import json
 import time
+import asyncio
 import logging
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import websockets
+from collections import deque
+from xxhash import xxh64_intdigest
+from websockets.exceptions import ConnectionClosed
 from datetime import datetime, timezone
+from urllib.parse import urlparse
+from cachetools import TTLCache
+from sortedcontainers import SortedDict
 from dotenv import load_dotenv
 from py_clob_client.client import ClobClient
-from py_clob_client.clob_types import OrderArgs, OrderType, ApiCreds, BalanceAllowanceParams, OpenOrderParams, AssetType
+from py_clob_client.clob_types import OrderArgs, OrderType, ApiCreds, BalanceAllowanceParams, OpenOrderParams, AssetType, PostOrdersArgs, TradeParams
 from py_clob_client.constants import POLYGON
+from py_clob_client.config import get_contract_config
+from py_clob_client.order_builder.builder import OrderBuilder, ROUNDING_CONFIG
+from py_order_utils.builders import OrderBuilder as UtilsOrderBuilder
+from py_order_utils.signer import Signer as UtilsSigner
+from py_order_utils.model import OrderData
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -14,6 +31,92 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+MARKET_WS_URL = "wss://ws-subscriptions-clob.polymarket.com/ws/market"
+USER_WS_URL = "wss://ws-subscriptions-clob.polymarket.com/ws/user"
+HEARTBEAT_INTERVAL = 10
+MAX_RECONNECT_DELAY = 60
+# Ladder orders are GTD: the CLOB rejects expirations less than a minute out,
+# so rungs live for GTD_SECURITY_WINDOW + ORDER_TTL seconds.
+GTD_SECURITY_WINDOW = 60
+ORDER_TTL = 30
+ORDER_POST_TIMEOUT = 0.4
+# Number of recent market messages remembered to drop repeated snapshots
+RECENT_MESSAGES = 64
+# Conditional token balances are reported in base units
+TOKEN_DECIMALS = 6
+# Minimum spacing between exit attempts after a failed sell
+EXIT_RETRY_INTERVAL = 5
+# Re-check over REST if neither channel has pushed anything for this long
+MONITOR_FALLBACK_INTERVAL = 15
+
+class TopOfBook:
+    """Best bid/ask for a token, converted to floats once per book update."""
+    __slots__ = ('bid', 'ask', 'ts')
+
+    def __init__(self, bid=None, ask=None, ts=0.0):
+        self.bid = bid
+        self.ask = ask
+        self.ts = ts
+
+def _parse_tob(ob):
+    """Extract the top of book from a REST order book summary."""
+    # The CLOB lists levels from worst to best, so the best price is last
+    bid = float(ob.bids[-1].price) if ob.bids else None
+    ask = float(ob.asks[-1].price) if ob.asks else None
+    return TopOfBook(bid, ask, time.time())
+
+class CachedOrderBuilder(OrderBuilder):
+    """OrderBuilder that reuses the EIP-712 domain and signing key across orders.
+
+    The stock builder derives the exchange domain separator and a fresh signer
+    for every order; here they are built once per exchange (regular / neg-risk).
+    """
+
+    def __init__(self, signer, sig_type=None, funder=None):
+        super().__init__(signer, sig_type=sig_type, funder=funder)
+        self.signer_address = self.signer.address()
+        self._exchange_builders = {}
+
+    def _get_exchange_builder(self, neg_risk):
+        builder = self._exchange_builders.get(neg_risk)
+        if builder is None:
+            chain_id = self.signer.get_chain_id()
+            contract_config = get_contract_config(chain_id, neg_risk)
+            builder = UtilsOrderBuilder(
+                contract_config.exchange,
+                chain_id,
+                UtilsSigner(key=self.signer.private_key)
+            )
+            self._exchange_builders[neg_risk] = builder
+        return builder
+
+    def create_order(self, order_args, options):
+        """Creates and signs an order using the cached domain."""
+        # Mirrors OrderBuilder.create_order from py-clob-client 0.30.0-0.34.6 (unchanged
+        # across that range); requirements.txt caps the version so a changed order
+        # format cannot be signed with this copy. Re-check it before raising the cap.
+        side, maker_amount, taker_amount = self.get_order_amounts(
+            order_args.side,
+            order_args.size,
+            order_args.price,
+            ROUNDING_CONFIG[options.tick_size]
+        )
+
+        data = OrderData(
+            maker=self.funder,
+            taker=order_args.taker,
+            tokenId=order_args.token_id,
+            makerAmount=str(maker_amount),
+            takerAmount=str(taker_amount),
+            side=side,
+            feeRateBps=str(order_args.fee_rate_bps),
+            nonce=str(order_args.nonce),
+            signer=self.signer_address,
+            expiration=str(order_args.expiration),
+            signatureType=self.sig_type
+        )
+        return self._get_exchange_builder(options.neg_risk).build_signed_order(data)
+
 class PolymarketBot:
     def __init__(self):
         self.host = "https://clob.polymarket.com"
@@ -29,6 +132,10 @@ class PolymarketBot:
             api_passphrase=self.passphrase
         )
         
+        # py-clob-client >= 0.30 sends every call through one module-level
+        # httpx.Client(http2=True), so orders, cancels, book and balance
+        # requests (including concurrent ones from worker threads) are
+        # multiplexed over a single TLS connection to the CLOB.
         self.client = ClobClient(
             self.host,
             chain_id=self.chain_id,
@@ -38,16 +145,46 @@ class PolymarketBot:
         
         # Explicitly set API credentials for authenticated requests
         self.client.set_api_creds(creds)
+
+        # Sign orders with a cached domain separator and funder/safe address
+        self.client.builder = CachedOrderBuilder(
+            self.client.signer,
+            sig_type=self.client.builder.sig_type,
+            funder=self.client.builder.funder
+        )
+
+        # Reuse one keep-alive connection pool for Gamma API lookups
+        self.http = requests.Session()
+        self.http.mount("https://", HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=4,
+            max_retries=Retry(total=2, backoff_factor=0.2)
+        ))
+
+        # Gamma lookups keyed by slug. Full market data expires sooner since endDate can shift.
+        self._slug_cache = TTLCache(maxsize=256, ttl=60)
+        self._gamma_cache = TTLCache(maxsize=256, ttl=30)
+
+    def refresh_market(self, market_slug):
+        """Drop cached Gamma data for a slug so the next lookup hits the API."""
+        self._slug_cache.pop(market_slug, None)
+        self._gamma_cache.pop(market_slug, None)
         
     def resolve_slug_to_condition_id(self, market_slug):
         """Use Gamma API to resolve slug to condition_id."""
+        condition_id = self._slug_cache.get(market_slug)
+        if condition_id:
+            return condition_id
         try:
             url = f"https://gamma-api.polymarket.com/markets?slug={market_slug}"
-            resp = requests.get(url)
+            resp = self.http.get(url, timeout=3.0)
             if resp.status_code == 200:
-                data = resp.json()
+                data = orjson.loads(resp.content)
                 if data and len(data) > 0:
-                    return data[0].get('conditionId')
+                    condition_id = data[0].get('conditionId')
+                    if condition_id:
+                        self._slug_cache[market_slug] = condition_id
+                    return condition_id
             return None
         except Exception as e:
             logger.error(f"Error resolving slug via Gamma API: {e}")
@@ -57,94 +194,182 @@ class PolymarketBot:
         """Fetch market details by slug, resolving via Gamma if necessary."""
         try:
             # 1. Try resolving via Gamma API first to get condition_id and granular data
-            url = f"https://gamma-api.polymarket.com/markets?slug={market_slug}"
-            resp = requests.get(url)
-            gamma_data = None
-            if resp.status_code == 200:
-                data = resp.json()
-                if data and len(data) > 0:
-                    gamma_data = data[0]
-                    condition_id = gamma_data.get('conditionId')
-                    logger.info(f"Resolved slug {market_slug} to Condition ID: {condition_id}")
-                    market = self.client.get_market(condition_id)
-                    # Merge granular data from Gamma (like exact endDate)
-                    market.update(gamma_data)
-                    return market
-            
-            # 2. Fallback to direct slug lookup
-            market = self.client.get_market(market_slug)
+            gamma_data = self._gamma_cache.get(market_slug)
+            if gamma_data is None:
+                url = f"https://gamma-api.polymarket.com/markets?slug={market_slug}"
+                resp = self.http.get(url, timeout=3.0)
+                if resp.status_code == 200:
+                    data = orjson.loads(resp.content)
+                    if data and len(data) > 0:
+                        gamma_data = data[0]
+                        self._gamma_cache[market_slug] = gamma_data
+
+            if gamma_data:
+                condition_id = gamma_data.get('conditionId')
+                if condition_id:
+                    self._slug_cache[market_slug] = condition_id
+                logger.info(f"Resolved slug {market_slug} to Condition ID: {condition_id}")
+                market = self.client.get_market(condition_id)
+                # Merge granular data from Gamma (like exact endDate)
+                market.update(gamma_data)
+            else:
+                # 2. Fallback to direct slug lookup
+                market = self.client.get_market(market_slug)
+
+            # Parse the close time once so time checks are a plain subtraction
+            market['_close_epoch'] = self.get_close_epoch(market)
             return market
         except Exception as e:
             logger.error(f"Error fetching market details: {e}")
             return None
 
-    def check_time_remaining(self, market_data, threshold_minutes=13):
-        """Check if remaining time is more than threshold."""
+    def get_close_epoch(self, market_data):
+        """Return the market close time in epoch seconds, or None if unknown."""
         # Use Gamma API granular timestamp if available, fallback to CLOB
         close_time_str = market_data.get('endDate') or market_data.get('end_date_iso')
         if not close_time_str:
+            return None
+        # Standardize format for fromisoformat
+        return datetime.fromisoformat(close_time_str.replace('Z', '+00:00')).timestamp()
+
+    def check_time_remaining(self, market_data, threshold_minutes=13):
+        """Check if remaining time is more than threshold."""
+        close_epoch = market_data.get('_close_epoch')
+        if close_epoch is None:
             logger.warning("Could not find close time in market data.")
             return False
             
-        # Standardize format for fromisoformat
-        close_time = datetime.fromisoformat(close_time_str.replace('Z', '+00:00'))
-        now = datetime.now(timezone.utc)
-        remaining = (close_time - now).total_seconds() / 60
+        remaining_sec = close_epoch - time.time()
         
-        logger.info(f"Market close time: {close_time}")
-        logger.info(f"Time remaining: {remaining:.2f} minutes")
-        return remaining > threshold_minutes
+        # datetime is only built for the log line, never for the comparison
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"Market close time: {datetime.fromtimestamp(close_epoch, tz=timezone.utc)}")
+            logger.info(f"Time remaining: {remaining_sec / 60:.2f} minutes")
+        return remaining_sec > threshold_minutes * 60
+
+    async def place_ladder_orders(self, token_id, prices, size, expiration):
+        """Sign all ladder rungs as GTD orders and submit them in a single batch request.
+
+        If the batch is not acknowledged within ORDER_POST_TIMEOUT the ladder is
+        abandoned and any orders that still land are swept. Their ids are still
+        returned so fills that beat the sweep are monitored.
+        """
+        try:
+            signed = await asyncio.to_thread(
+                lambda: [
+                    self.client.create_order(OrderArgs(
+                        price=price, size=size, side="BUY", token_id=token_id, expiration=expiration
+                    ))
+                    for price in prices
+                ]
+            )
+            post = asyncio.ensure_future(asyncio.to_thread(
+                self.client.post_orders,
+                [PostOrdersArgs(order=order, orderType=OrderType.GTD) for order in signed]
+            ))
+            statuses = await asyncio.wait_for(asyncio.shield(post), timeout=ORDER_POST_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"Ladder not acknowledged within {ORDER_POST_TIMEOUT}s. Cancelling late orders.")
+            return await self._sweep_late_orders(post, token_id)
+        except Exception as e:
+            logger.error(f"Exception placing ladder orders: {e}")
+            return []
 
-    def place_ladder_orders(self, token_id, prices, size):
-        """Place laddered limit orders."""
+        # The batch endpoint answers with one status per submitted order, in order.
+        if not isinstance(statuses, list):
+            statuses = []
         order_ids = []
-        for price in prices:
+        failed = []
+        for i, price in enumerate(prices):
+            resp = statuses[i] if i < len(statuses) else None
+            if resp and isinstance(resp, dict) and resp.get('success'):
+                order_id = resp.get('orderID')
+                order_ids.append(order_id)
+                logger.info(f"Placed LIMIT order at {price}: {order_id}")
+            else:
+                logger.warning(f"Batch placement failed at {price}: {resp}. Retrying individually.")
+                failed.append(i)
+
+        if failed:
+            # The retries get the same deadline and late-ack sweep as the batch
+            retry = asyncio.ensure_future(asyncio.gather(
+                *[asyncio.to_thread(self.client.post_order, signed[i], OrderType.GTD) for i in failed],
+                return_exceptions=True
+            ))
             try:
-                order_args = OrderArgs(
-                    price=price,
-                    size=size,
-                    side="BUY",
-                    token_id=token_id
-                )
-                resp = self.client.create_and_post_order(order_args)
-                if resp and isinstance(resp, dict) and resp.get('success'):
+                results = await asyncio.wait_for(asyncio.shield(retry), timeout=ORDER_POST_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning(f"Retried rungs not acknowledged within {ORDER_POST_TIMEOUT}s. Cancelling late orders.")
+                return order_ids + await self._sweep_late_orders(retry, token_id)
+            for i, resp in zip(failed, results):
+                if isinstance(resp, Exception):
+                    logger.error(f"Exception placing order at {prices[i]}: {resp}")
+                elif resp and isinstance(resp, dict) and resp.get('success'):
                     order_id = resp.get('orderID')
                     order_ids.append(order_id)
-                    logger.info(f"Placed LIMIT order at {price}: {order_id}")
+                    logger.info(f"Placed LIMIT order at {prices[i]}: {order_id}")
                 else:
-                    logger.error(f"Failed to place order at {price}: {resp}")
+                    logger.error(f"Failed to place order at {prices[i]}: {resp}")
+        return order_ids
+
+    async def _sweep_late_orders(self, post, token_id):
+        """Wait for a timed-out post to finish, cancel whatever it placed and return those order ids.
+
+        ``post`` resolves to a list of per-order responses. Only when it failed
+        outright, so the placed ids are unknown, is every order on the asset cancelled.
+        """
+        statuses, = await asyncio.gather(post, return_exceptions=True)
+        if not isinstance(statuses, list):
+            logger.warning(f"Late post failed ({statuses}). Cancelling all orders on {token_id}.")
+            try:
+                await asyncio.to_thread(self.client.cancel_market_orders, asset_id=token_id)
             except Exception as e:
-                logger.error(f"Exception placing order: {e}")
+                logger.error(f"Error cancelling late orders: {e}")
+            return []
+
+        order_ids = [
+            resp.get('orderID') for resp in statuses
+            if isinstance(resp, dict) and resp.get('success')
+        ]
+        for order_id in order_ids:
+            logger.info(f"Late acknowledgement for order {order_id}")
+        if order_ids:
+            try:
+                await asyncio.to_thread(self.client.cancel_orders, order_ids)
+            except Exception as e:
+                logger.error(f"Error cancelling late orders: {e}")
         return order_ids
 
-    def get_position_value(self, token_id, amount):
+    async def get_position_value(self, token_id, amount):
         """Calculate current value of positions based on order book mid-price."""
         try:
-            ob = self.client.get_order_book(token_id)
-            # Simple mid-price calculation
-            bids = ob.get('bids', [])
-            asks = ob.get('asks', [])
-            if not bids or not asks:
+            ob = await asyncio.to_thread(self.client.get_order_book, token_id)
+            tob = _parse_tob(ob)
+            if tob.bid is None or tob.ask is None:
                 return 0
-            
-            best_bid = float(bids[0]['price'])
-            best_ask = float(asks[0]['price'])
-            mid_price = (best_bid + best_ask) / 2
-            return amount * mid_price
+
+            # Simple mid-price calculation
+            return amount * (tob.bid + tob.ask) / 2
         except Exception as e:
             logger.error(f"Error getting position value: {e}")
             return 0
 
-    def close_all_positions(self, token_id, amount):
-        """Cancel orders and sell all held tokens."""
+    async def close_all_positions(self, token_id, amount):
+        """Cancel orders and sell all held tokens. Returns False if the sell was not placed."""
         # 1. Cancel open orders
         try:
             params = OpenOrderParams(asset_id=token_id)
-            open_orders = self.client.get_orders(params)
-            for order in open_orders:
-                order_id = order.get('orderID')
+            open_orders = await asyncio.to_thread(self.client.get_orders, params)
+            order_ids = [order.get('id') for order in open_orders]
+            for order_id in order_ids:
                 logger.info(f"Cancelling order {order_id}...")
-                self.client.cancel(order_id)
+            results = await asyncio.gather(
+                *[asyncio.to_thread(self.client.cancel, order_id) for order_id in order_ids],
+                return_exceptions=True
+            )
+            for order_id, resp in zip(order_ids, results):
+                if isinstance(resp, Exception):
+                    logger.error(f"Error cancelling order {order_id}: {resp}")
         except Exception as e:
             logger.error(f"Error cancelling orders: {e}")
             
@@ -160,79 +385,310 @@ class PolymarketBot:
                     side="SELL",
                     token_id=token_id
                 )
-                self.client.create_and_post_order(order_args)
+                resp = await asyncio.to_thread(self.client.create_and_post_order, order_args)
+                if not (resp and isinstance(resp, dict) and resp.get('success')):
+                    logger.error(f"Sell order rejected: {resp}")
+                    return False
                 logger.info("Sell order placed.")
         except Exception as e:
             logger.error(f"Error selling positions: {e}")
+            return False
+        return True
 
-    def get_token_balance(self, token_id):
-        """Get the current balance of a specific token."""
+    async def get_token_balance(self, token_id):
+        """Get the held balance of a specific token in shares, or None if it could not be read."""
         try:
             params = BalanceAllowanceParams(
                 asset_type=AssetType.CONDITIONAL,
                 token_id=token_id
             )
-            resp = self.client.get_balance_allowance(params)
-            return float(resp.get('balance', 0))
+            resp = await asyncio.to_thread(self.client.get_balance_allowance, params)
+            return float(resp.get('balance', 0)) / 10 ** TOKEN_DECIMALS
         except Exception as e:
             logger.error(f"Error getting token balance: {e}")
-            return 0
+            return None
+
+    async def monitor_and_close(self, token_id, condition_id, order_ids, expires_at):
+        """Monitor positions over the market and user WebSockets and close when 30% profit reached.
 
-    def monitor_and_close(self, token_id, initial_total_cost):
-        """Monitor positions and close when 30% profit reached."""
+        Profit is measured against the realized cost of our fills. If nothing has
+        filled by ``expires_at`` (epoch seconds) the remaining orders are cancelled.
+        """
         logger.info(f"Monitoring Token ID: {token_id}")
-        logger.info(f"Target Profit: {initial_total_cost * 1.3:.4f} USDC (Total Value)")
-        
-        while True:
-            try:
-                balance = self.get_token_balance(token_id)
-                if balance <= 0:
-                    # check if we still have open orders
-                    params = OpenOrderParams(asset_id=token_id)
-                    open_orders = self.client.get_orders(params)
-                    if not open_orders:
-                        logger.info("No balance and no open orders. Exiting monitoring.")
-                        break
-                    logger.info("Waiting for orders to fill...")
-                    time.sleep(10)
-                    continue
+        logger.info("Target Profit: 30% over realized cost of fills")
 
-                # Get current price
-                ob = self.client.get_order_book(token_id)
-                asks = ob.get('asks', [])
-                if not asks:
-                    logger.warning("No asks in orderbook, cannot calculate sell value.")
-                    time.sleep(10)
-                    continue
+        # Local order book (price -> size) kept current from one snapshot plus deltas
+        self.bids = SortedDict()
+        self.asks = SortedDict()
+        self.tob = TopOfBook()
+        await self._refresh_book(token_id)
+        self.filled_size = 0
+        self.realized_cost = 0
+        self.order_ids = set(order_ids)
+        self.open_orders = set(order_ids)
+        self._seen_trades = set()
+        self._next_exit_attempt = 0
+        # Last state written to the log, so repeated wake-ups stay quiet
+        self._logged_open_orders = None
+        self._logged_value = None
+        # Until the first user-channel sync, fills that landed before we subscribed are unknown
+        self._synced = False
+        self._recent = deque(maxlen=RECENT_MESSAGES)
+        self._recent_set = set()
+        # Set by both channels; the monitor re-evaluates on every wake-up.
+        self.update_event = asyncio.Event()
+        self.update_event.set()
+        expiry = asyncio.get_running_loop().call_later(
+            max(expires_at - time.time(), 0), self.update_event.set
+        )
 
-                # Use best bid (since we want to sell)
-                bids = ob.get('bids', [])
-                if not bids:
-                    logger.warning("No bids in orderbook, cannot calculate sell value.")
-                    time.sleep(10)
+        market_sub = {"assets_ids": [token_id], "type": "market"}
+        user_sub = {
+            "auth": {"apiKey": self.key, "secret": self.secret, "passphrase": self.passphrase},
+            "markets": [condition_id],
+            "type": "user"
+        }
+        streams = [
+            asyncio.create_task(self._stream(
+                "market", MARKET_WS_URL, market_sub,
+                lambda message: self.on_market_message(token_id, message)
+            )),
+            asyncio.create_task(self._stream(
+                "user", USER_WS_URL, user_sub,
+                self.on_user_message,
+                on_connect=lambda: self._sync_orders(token_id, condition_id)
+            )),
+        ]
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self.update_event.wait(), timeout=MONITOR_FALLBACK_INTERVAL)
+                except asyncio.TimeoutError:
+                    await self._refresh_book(token_id)
+                self.update_event.clear()
+
+                if self.filled_size <= 0:
+                    if not self.open_orders and self._synced:
+                        logger.info("No fills and no open orders. Exiting monitoring.")
+                        break
+                    if time.time() >= expires_at:
+                        logger.info("No fills before order expiry. Cancelling and exiting monitoring.")
+                        await self.close_all_positions(token_id, 0)
+                        break
+                    if self.open_orders != self._logged_open_orders:
+                        logger.info(f"Waiting for {len(self.open_orders)} open order(s) to fill...")
+                        self._logged_open_orders = set(self.open_orders)
                     continue
-                
-                current_price = float(bids[0]['price'])
-                current_value = balance * current_price
-                
-                # Check for 30% profit
-                # initial_total_cost is the total USDC spent to acquire 'balance'
-                # For simplicity, if we don't track exact fills yet, we use a fixed target
-                if current_value >= initial_total_cost * 1.3:
-                    logger.info(f"PROFIT TARGET REACHED: {current_value:.4f} >= {initial_total_cost * 1.3:.4f}")
-                    self.close_all_positions(token_id, balance)
+
+                if await self._check_profit(token_id):
                     break
-                else:
-                    logger.info(f"Current Value: {current_value:.4f} | Target: {initial_total_cost * 1.3:.4f}")
-                
+        finally:
+            expiry.cancel()
+            for task in streams:
+                task.cancel()
+            await asyncio.gather(*streams, return_exceptions=True)
+
+    async def _refresh_book(self, token_id):
+        """Load a REST order book snapshot; also the fallback for a quiet market channel."""
+        try:
+            ob = await asyncio.to_thread(self.client.get_order_book, token_id)
+            self._load_book(
+                [(level.price, level.size) for level in ob.bids or []],
+                [(level.price, level.size) for level in ob.asks or []]
+            )
+        except Exception as e:
+            logger.error(f"Error refreshing order book: {e}")
+
+    async def _sync_orders(self, token_id, condition_id):
+        """Snapshot open orders and trades over REST so nothing missed while disconnected is lost."""
+        try:
+            params = OpenOrderParams(asset_id=token_id)
+            open_orders = await asyncio.to_thread(self.client.get_orders, params)
+            # Only the ladder's own orders count; manual or leftover orders on the token are ignored
+            self.open_orders = {order.get('id') for order in open_orders} & self.order_ids
+
+            trades = await asyncio.to_thread(self.client.get_trades, TradeParams(market=condition_id))
+            for trade in trades:
+                self._record_fill(trade)
+            self._synced = True
+            self.update_event.set()
+        except Exception as e:
+            logger.error(f"Error syncing orders: {e}")
+
+    async def _stream(self, channel, url, subscription, on_message, on_connect=None):
+        """Keep a channel subscription alive, reconnecting with exponential backoff."""
+        delay = 1
+        while True:
+            try:
+                async with websockets.connect(url) as ws:
+                    await ws.send(json.dumps(subscription))
+                    logger.info(f"Subscribed to {channel} channel.")
+                    delay = 1
+                    if on_connect:
+                        await on_connect()
+                    heartbeat = asyncio.create_task(self._heartbeat(ws))
+                    try:
+                        async for message in ws:
+                            on_message(message)
+                    finally:
+                        heartbeat.cancel()
+                        await asyncio.gather(heartbeat, return_exceptions=True)
+                # A clean close from the server ends the loop without raising
+                logger.warning(f"{channel.capitalize()} WebSocket closed by server ({ws.close_code}). Reconnecting in {delay}s...")
+            except (ConnectionClosed, OSError) as e:
+                logger.warning(f"{channel.capitalize()} WebSocket disconnected ({e}). Reconnecting in {delay}s...")
             except Exception as e:
-                logger.error(f"Error in monitoring loop: {e}")
-                
-            time.sleep(15)
+                logger.error(f"Error in {channel} stream: {e}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+    async def _heartbeat(self, ws):
+        """Send the application-level PING the CLOB channels expect."""
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            await ws.send("PING")
+
+    def _parse_events(self, channel, message):
+        """Decode a channel push into a list of events."""
+        if message == "PONG":
+            return []
+        try:
+            payload = orjson.loads(message)
+        except ValueError:
+            logger.warning(f"Unexpected {channel} message: {message}")
+            return []
+        return payload if isinstance(payload, list) else [payload]
+
+    def _load_book(self, bids, asks):
+        """Replace the local book with a snapshot of (price, size) levels."""
+        self.bids = SortedDict((float(price), float(size)) for price, size in bids)
+        self.asks = SortedDict((float(price), float(size)) for price, size in asks)
+        self._update_tob()
+
+    def _update_tob(self):
+        """Refresh the top of book from the ends of the sorted sides."""
+        self.tob.bid = self.bids.peekitem(-1)[0] if self.bids else None
+        self.tob.ask = self.asks.peekitem(0)[0] if self.asks else None
+        self.tob.ts = time.time()
+
+    def on_market_message(self, token_id, message):
+        """Apply a market channel snapshot or delta to the local book.
+
+        The monitor is only woken when the best bid moves while we hold a position;
+        other pushes cannot change its decision.
+        """
+        if self._is_duplicate(message):
+            return
+        previous_bid = self.tob.bid
+        for event in self._parse_events("market", message):
+            event_type = event.get('event_type')
+            if event_type == 'book' and event.get('asset_id') == token_id:
+                self._load_book(
+                    [(level['price'], level['size']) for level in event.get('bids', [])],
+                    [(level['price'], level['size']) for level in event.get('asks', [])]
+                )
+            elif event_type == 'price_change':
+                changed = False
+                for change in event.get('price_changes') or event.get('changes', []):
+                    if change.get('asset_id', event.get('asset_id')) != token_id:
+                        continue
+                    book = self.bids if change.get('side') == 'BUY' else self.asks
+                    price = float(change['price'])
+                    size = float(change['size'])
+                    if size > 0:
+                        book[price] = size
+                    else:
+                        book.pop(price, None)
+                    changed = True
+                if changed:
+                    self._update_tob()
+        if self.tob.bid != previous_bid and self.filled_size > 0:
+            self.update_event.set()
+
+    def _is_duplicate(self, message):
+        """Check a raw message against the hashes of the last RECENT_MESSAGES seen."""
+        digest = xxh64_intdigest(message.encode() if isinstance(message, str) else message)
+        if digest in self._recent_set:
+            return True
+        if len(self._recent) == self._recent.maxlen:
+            self._recent_set.discard(self._recent[0])
+        self._recent.append(digest)
+        self._recent_set.add(digest)
+        return False
+
+    def on_user_message(self, message):
+        """Track fills and order state changes for our ladder orders from the user channel."""
+        for event in self._parse_events("user", message):
+            event_type = event.get('event_type')
+            if event_type == 'trade':
+                if self._record_fill(event):
+                    self.update_event.set()
+            elif event_type == 'order':
+                order_id = event.get('id')
+                if order_id not in self.order_ids:
+                    continue
+                fully_matched = float(event.get('size_matched') or 0) >= float(event.get('original_size') or 0) > 0
+                if event.get('type') == 'CANCELLATION' or event.get('status') in ('MATCHED', 'CANCELED') or fully_matched:
+                    self.open_orders.discard(order_id)
+                    self.update_event.set()
 
-    def run(self, market_slug, time_threshold=13, outcome_index=1):
+    def _record_fill(self, trade):
+        """Add the part of a trade that filled our orders to filled size and realized cost.
+
+        Returns True if the trade was new and touched one of our orders.
+        """
+        # Trades are re-sent as they move MATCHED -> MINED -> CONFIRMED; count each once.
+        trade_id = trade.get('id')
+        if trade_id in self._seen_trades or trade.get('status') == 'FAILED':
+            return False
+
+        size, cost = 0, 0
+        if trade.get('taker_order_id') in self.order_ids:
+            size = float(trade.get('size') or 0)
+            cost = float(trade.get('price') or 0) * size
+        else:
+            for maker in trade.get('maker_orders', []):
+                if maker.get('order_id') in self.order_ids:
+                    matched = float(maker.get('matched_amount') or 0)
+                    size += matched
+                    cost += float(maker.get('price') or 0) * matched
+        if size <= 0:
+            return False
+
+        self._seen_trades.add(trade_id)
+        self.filled_size += size
+        self.realized_cost += cost
+        logger.info(f"Fill of {size} shares at {cost / size:.4f} (filled: {self.filled_size}, cost: {self.realized_cost:.4f})")
+        return True
+
+    async def _check_profit(self, token_id):
+        """Close the position if filled size at the cached best bid is 30% over realized cost."""
+        best_bid = self.tob.bid
+        if not best_bid:
+            return False
+
+        target = self.realized_cost * 1.3
+        current_value = self.filled_size * best_bid
+        if current_value >= target:
+            if time.time() < self._next_exit_attempt:
+                return False
+            logger.info(f"PROFIT TARGET REACHED: {current_value:.4f} >= {target:.4f}")
+            # Fills are counted before they settle and net of fees, so sell no more than is held
+            balance = await self.get_token_balance(token_id)
+            if balance and await self.close_all_positions(token_id, min(self.filled_size, balance)):
+                return True
+            logger.warning(f"Exit not completed (held balance: {balance}). Retrying in {EXIT_RETRY_INTERVAL}s.")
+            self._next_exit_attempt = time.time() + EXIT_RETRY_INTERVAL
+            return False
+
+        if (best_bid, self.filled_size) != self._logged_value:
+            logger.info(f"Current Value: {current_value:.4f} | Target: {target:.4f}")
+            self._logged_value = (best_bid, self.filled_size)
+        return False
+
+    async def run(self, market_slug, time_threshold=13, outcome_index=1):
         """Main execution loop."""
-        market_data = self.get_market_details(market_slug)
+        market_data = await asyncio.to_thread(self.get_market_details, market_slug)
         if not market_data:
             logger.error("Could not find market data.")
             return
@@ -243,8 +699,7 @@ class PolymarketBot:
             # Try to get clobTokenIds from Gamma data if tokens list is empty
             clob_token_ids = market_data.get('clobTokenIds')
             if clob_token_ids and isinstance(clob_token_ids, str):
-                import json
-                clob_token_ids = json.loads(clob_token_ids)
+                clob_token_ids = orjson.loads(clob_token_ids)
                 token_id = clob_token_ids[outcome_index]
             else:
                 logger.error("No tokens found in market data.")
@@ -264,20 +719,24 @@ class PolymarketBot:
         size_per_step = 10
         total_max_cost = sum(prices) * size_per_step
         
+        expiration = int(time.time()) + GTD_SECURITY_WINDOW + ORDER_TTL
+        
         logger.info(f"Placing ladder orders. Max theoretical cost: {total_max_cost} USDC")
-        self.place_ladder_orders(token_id, prices, size_per_step)
+        order_ids = await self.place_ladder_orders(token_id, prices, size_per_step, expiration)
         
         # Step 3: Monitor
-        self.monitor_and_close(token_id, total_max_cost)
+        condition_id = market_data.get('condition_id') or market_data.get('conditionId')
+        # Rungs can only fill until they expire or the market closes
+        expires_at = min(expiration, market_data['_close_epoch'])
+        await self.monitor_and_close(token_id, condition_id, order_ids, expires_at)
 
 def parse_url(url):
     """Extract slug from Polymarket URL."""
+    # Example: https://polymarket.com/event/btc-updown-15m-1766699100?tid=1766699194314
     try:
-        # Example: https://polymarket.com/event/btc-updown-15m-1766699100?tid=1766699194314
-        path = url.split("?")[0]
-        slug = path.split("/")[-1]
-        return slug
-    except Exception:
+        return urlparse(url).path.rpartition('/')[2] or None
+    except ValueError:
+        # e.g. a malformed IPv6 host
         return None
 
 if __name__ == "__main__":
@@ -296,4 +755,4 @@ if __name__ == "__main__":
     if not slug:
         print("Invalid URL format.")
     else:
-        bot.run(slug, time_threshold=threshold)
+        asyncio.run(bot.run(slug, time_threshold=threshold))
@@ -1,11 +1,61 @@
 import os
+import base64
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from py_clob_client.client import ClobClient
 from py_clob_client.clob_types import ApiCreds
+from py_clob_client.constants import END_CURSOR
 
 load_dotenv()
 
-def find_market(keyword):
+SEARCH_FIELDS = ("question", "market_slug")
+MAX_WORKERS = 8
+REQUESTS_PER_SECOND = 5
+MAX_RETRIES = 3
+
+def encode_cursor(offset):
+    """CLOB cursors are the base64 of the row offset."""
+    return base64.b64encode(str(offset).encode()).decode()
+
+def decode_cursor(cursor):
+    """Return the row offset behind a cursor, or None if it is not one."""
+    try:
+        return int(base64.b64decode(cursor).decode())
+    except (ValueError, TypeError):
+        return None
+
+async def fetch_markets(client, executor, limiter, cursor):
+    """Fetch one page of markets on the worker pool, at most REQUESTS_PER_SECOND starts per second.
+
+    Failed requests (e.g. a 429) are retried with backoff; the last failure is raised.
+    """
+    loop = asyncio.get_running_loop()
+    for attempt in range(MAX_RETRIES + 1):
+        await limiter.acquire()
+        loop.call_later(1, limiter.release)
+        try:
+            return await loop.run_in_executor(executor, functools.partial(client.get_markets, next_cursor=cursor))
+        except Exception as e:
+            if attempt == MAX_RETRIES:
+                raise
+            print(f"Error fetching cursor {cursor!r} ({e}). Retrying in {2 ** attempt}s...")
+            await asyncio.sleep(2 ** attempt)
+
+def print_matches(markets, kw_lower):
+    for m in markets:
+        if any(kw_lower in (m.get(field) or '').lower() for field in SEARCH_FIELDS):
+            print(f"Found Market: {m.get('question')}")
+            print(f"Slug: {m.get('market_slug')}")
+            print(f"Condition ID: {m.get('condition_id')}")
+            print(f"Tokens: {m.get('tokens')}")
+
+def is_last_page(resp):
+    cursor = resp.get('next_cursor')
+    return not cursor or cursor == END_CURSOR or not resp.get('data')
+
+async def find_market(keyword):
     host = "https://clob.polymarket.com"
     key = os.getenv("PRIVATE_KEY")
     creds = ApiCreds(
@@ -15,25 +65,42 @@ def find_market(keyword):
     )
     client = ClobClient(host, key=key, chain_id=137, creds=creds)
     
-    cursor = ""
-    while True:
-        resp = client.get_markets(next_cursor=cursor)
-        markets = resp.get('data', [])
-        for m in markets:
-            if keyword.lower() in m.get('question', '').lower() or \
-               keyword.lower() in m.get('market_slug', '').lower():
-                print(f"Found Market: {m.get('question')}")
-                print(f"Slug: {m.get('market_slug')}")
-                print(f"Condition ID: {m.get('condition_id')}")
-                print(f"Tokens: {m.get('tokens')}")
-                # return m
+    kw_lower = keyword.lower()
+    limiter = asyncio.Semaphore(REQUESTS_PER_SECOND)
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        fetch = functools.partial(fetch_markets, client, executor, limiter)
+        
+        resp = await fetch("")
+        print_matches(resp.get('data', []), kw_lower)
+        
+        # The offset after the first page is the page size, so later cursors
+        # can be computed and fetched MAX_WORKERS pages at a time.
+        page_size = decode_cursor(resp.get('next_cursor'))
+        if page_size and not is_last_page(resp):
+            offset = page_size
+            done = False
+            while not done:
+                cursors = [encode_cursor(offset + i * page_size) for i in range(MAX_WORKERS)]
+                pages = await asyncio.gather(*[fetch(c) for c in cursors])
+                for page in pages:
+                    # Requests past the end come back empty
+                    print_matches(page.get('data', []), kw_lower)
+                    if is_last_page(page):
+                        done = True
+                        break
+                offset += MAX_WORKERS * page_size
         
-        cursor = resp.get('next_cursor')
-        if not cursor:
-            break
+        elif not is_last_page(resp):
+            # Opaque cursors: walk them in order, requesting the following page
+            # while the current one is filtered
+            next_page = asyncio.create_task(fetch(resp['next_cursor']))
+            while next_page:
+                resp = await next_page
+                next_page = None if is_last_page(resp) else asyncio.create_task(fetch(resp['next_cursor']))
+                print_matches(resp.get('data', []), kw_lower)
     print("Search complete.")
 
 if __name__ == "__main__":
     import sys
     kw = sys.argv[1] if len(sys.argv) > 1 else "btc"
-    find_market(kw)
+    asyncio.run(find_market(kw))